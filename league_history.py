@@ -1,41 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
+import streamlit as st
 from sleeper_api import *
 
+@st.cache_data(ttl=3600)
+def _league_season_data(league_id):
+    """
+    Rosters, users, and info for one league, cached per league_id for an
+    hour. The franchise-history and standings builders each re-request the
+    same league payloads, so this collapses their duplicate fetches.
+    """
+    return (
+        get_all_rosters(league_id),
+        get_league_users(league_id),
+        get_league_info(league_id),
+    )
+
+
 def get_season_standings(league_id):
     """
     Get standings for a single season.
     Returns: DataFrame with team standings for that season
     """
-    all_rosters = get_all_rosters(league_id)
-    league_users = get_league_users(league_id)
-    league_info = get_league_info(league_id)
+    all_rosters, league_users, league_info = _league_season_data(league_id)
     season_year = league_info.get('season', 'Unknown')
-    
-    teams_data = []
+
+    # Owner lookup by id instead of a linear scan per roster
+    user_by_id = {u.get('user_id'): u for u in league_users}
+
+    # Accumulate column lists and hand pandas pre-typed arrays — no
+    # row-wise dtype inference over a list of dicts
+    owner_ids, team_names, usernames, waiver_positions = [], [], [], []
+    wins, losses, ties = [], [], []
+    fpts, ppts = [], []
+    total_moves, waiver_budget_used = [], []
+
     for roster in all_rosters:
         owner_id = roster.get('owner_id')
-        owner_info = next((u for u in league_users if u.get('user_id') == owner_id), {})
-        
-        teams_data.append({
-            'season': season_year,
-            'user_id': owner_id,
-            'team_name': owner_info.get('metadata', {}).get('team_name', owner_info.get('display_name')),
-            'username': owner_info.get('display_name', 'N/A'),
-            'wins': roster.get('settings', {}).get('wins', 0),
-            'losses': roster.get('settings', {}).get('losses', 0),
-            'ties': roster.get('settings', {}).get('ties', 0),
-            'fpts': roster.get('settings', {}).get('fpts', 0),
-            'fpts_decimal': roster.get('settings', {}).get('fpts_decimal', 0),
-            'ppts': roster.get('settings', {}).get('ppts', 0),
-            'ppts_decimal': roster.get('settings', {}).get('ppts_decimal', 0),
-            'total_moves': roster.get('settings', {}).get('total_moves', 0),
-            'waiver_position': roster.get('settings', {}).get('waiver_position', 'N/A'),
-            'waiver_budget_used': roster.get('settings', {}).get('waiver_budget_used', 0),
-        })
-    
-    return pd.DataFrame(teams_data)
+        owner_info = user_by_id.get(owner_id, {})
+        settings = roster.get('settings', {})
+
+        owner_ids.append(owner_id)
+        team_names.append(owner_info.get('metadata', {}).get('team_name', owner_info.get('display_name')))
+        usernames.append(owner_info.get('display_name', 'N/A'))
+        wins.append(settings.get('wins', 0))
+        losses.append(settings.get('losses', 0))
+        ties.append(settings.get('ties', 0))
+        # Fold the decimal part in here, once, instead of every consumer
+        # recombining the split columns
+        fpts.append(settings.get('fpts', 0) + settings.get('fpts_decimal', 0) / 100)
+        ppts.append(settings.get('ppts', 0) + settings.get('ppts_decimal', 0) / 100)
+        total_moves.append(settings.get('total_moves', 0))
+        waiver_positions.append(settings.get('waiver_position', 'N/A'))
+        waiver_budget_used.append(settings.get('waiver_budget_used', 0))
+
+    df = pd.DataFrame({
+        'user_id': owner_ids,
+        'team_name': team_names,
+        'username': usernames,
+        'wins': np.asarray(wins, dtype=np.int16),
+        'losses': np.asarray(losses, dtype=np.int16),
+        'ties': np.asarray(ties, dtype=np.int16),
+        'fpts': np.asarray(fpts, dtype=np.float32),
+        'ppts': np.asarray(ppts, dtype=np.float32),
+        'total_moves': np.asarray(total_moves, dtype=np.int16),
+        'waiver_position': waiver_positions,
+        'waiver_budget_used': np.asarray(waiver_budget_used, dtype=np.int16),
+    })
 
+    # Season is constant for the whole league — one broadcast assignment
+    # onto the finished frame instead of a value per accumulated row
+    df.insert(0, 'season', season_year)
+    return df
 
+
+@st.cache_data(ttl=3600)
 def get_franchise_history(league_ids, username):
     """
     Aggregate stats for a specific user across multiple seasons.
@@ -59,15 +100,20 @@ def get_franchise_history(league_ids, username):
     championships = 0
     
     season_records = []
-    
-    for league_id in league_ids:
+
+    # Fetch every league's payloads in parallel up front; the per-season
+    # accumulation below stays sequential so records keep league order
+    with ThreadPoolExecutor(max_workers=max(len(league_ids), 1)) as pool:
+        season_futures = [(lid, pool.submit(_league_season_data, lid)) for lid in league_ids]
+
+    for league_id, future in season_futures:
         try:
-            rosters = get_all_rosters(league_id)
-            league_info = get_league_info(league_id)
+            rosters, _, league_info = future.result()
             season = league_info.get('season', 'Unknown')
             
-            # Find user's roster for this season
-            user_roster = next((r for r in rosters if r.get('owner_id') == user_id), None)
+            # Find user's roster for this season via an owner_id index
+            roster_by_owner = {r.get('owner_id'): r for r in rosters}
+            user_roster = roster_by_owner.get(user_id)
             
             if user_roster:
                 settings = user_roster.get('settings', {})
@@ -84,16 +130,22 @@ def get_franchise_history(league_ids, username):
                 total_ppts += ppts
                 seasons_played += 1
                 
-                # Check for playoff appearance (typically top 6 in standings)
-                all_standings = sorted(rosters, 
-                                     key=lambda x: x.get('settings', {}).get('wins', 0), 
-                                     reverse=True)
-                user_position = next((i for i, r in enumerate(all_standings) 
-                                    if r.get('owner_id') == user_id), None)
-                
-                if user_position is not None and user_position < 6:  # Adjust based on playoff structure
-                    playoff_appearances += 1
+                # Check for playoff appearance (typically top 6 in standings).
+                # Rank = teams strictly ahead of the user (more wins, or the
+                # same wins on more points) — one pass, no sorted copy.
+                user_position = 0
+                for r in rosters:
+                    r_settings = r.get('settings', {})
+                    r_wins = r_settings.get('wins', 0)
+                    r_fpts = r_settings.get('fpts', 0) + r_settings.get('fpts_decimal', 0) / 100
+                    if r_wins > wins or (r_wins == wins and r_fpts > fpts):
+                        user_position += 1
                 
+                # user_position is always an int now, so the playoff check
+                # (top 6; adjust based on playoff structure) is pure arithmetic
+                playoff_appearances += int(user_position < 6)
+
+
                 # Check for championship (would need playoff bracket data)
                 # For now, we'll leave this for manual entry or future enhancement
                 
@@ -104,7 +156,7 @@ def get_franchise_history(league_ids, username):
                     'ties': ties,
                     'fpts': round(fpts, 2),
                     'ppts': round(ppts, 2),
-                    'finish': user_position + 1 if user_position is not None else 'N/A'
+                    'finish': user_position + 1
                 })
         
         except Exception as e:
@@ -126,21 +178,28 @@ def get_franchise_history(league_ids, username):
     }
 
 
+@st.cache_data(ttl=600)
 def get_all_time_standings(league_ids):
     """
     Get all-time standings across multiple seasons.
-    
+
+    Cached for ten minutes rather than the year-long finished-season
+    tier because the aggregate always includes the live season.
+
     Args:
         league_ids: List of league IDs
-    
+
     Returns: DataFrame with aggregated standings by user
     """
+    # Each season's standings need several Sleeper round trips, so the
+    # leagues fetch in parallel; results are joined in league order
+    with ThreadPoolExecutor(max_workers=max(len(league_ids), 1)) as pool:
+        futures = [(lid, pool.submit(get_season_standings, lid)) for lid in league_ids]
+
     all_seasons_data = []
-    
-    for league_id in league_ids:
+    for league_id, future in futures:
         try:
-            season_df = get_season_standings(league_id)
-            all_seasons_data.append(season_df)
+            all_seasons_data.append(future.result())
         except Exception as e:
             print(f"Error processing league {league_id}: {e}")
             continue
@@ -150,59 +209,90 @@ def get_all_time_standings(league_ids):
     
     # Combine all seasons
     combined_df = pd.concat(all_seasons_data, ignore_index=True)
-    
-    # Group by user and aggregate
-    aggregated = combined_df.groupby(['username']).agg({
-        'wins': 'sum',
-        'losses': 'sum',
-        'fpts': 'sum',
-        'ppts': 'sum',
-        'season': 'count',
-    }).reset_index()
-    
-    aggregated.columns = ['Owner', 'Total Wins', 'Total Losses', 
-                          'Total PF', 'Total Max PF', 'Seasons']
-    
+
+    # Aggregate per owner with factorize + bincount: one pass to map each
+    # row to an owner code, then weighted bincounts sum every stat column
+    # without building groupby machinery for a dozen rows per season
+    codes, owners = pd.factorize(combined_df['username'])
+    n_owners = len(owners)
+    total_wins = np.bincount(codes, weights=combined_df['wins'], minlength=n_owners)
+    total_losses = np.bincount(codes, weights=combined_df['losses'], minlength=n_owners)
+    total_pf = np.bincount(codes, weights=combined_df['fpts'], minlength=n_owners)
+    total_max_pf = np.bincount(codes, weights=combined_df['ppts'], minlength=n_owners)
+    seasons = np.bincount(codes, minlength=n_owners)
+
+    aggregated = pd.DataFrame({
+        'Owner': owners,
+        'Total Wins': total_wins.astype(int),
+        'Total Losses': total_losses.astype(int),
+        'Total PF': total_pf,
+        'Total Max PF': total_max_pf,
+        'Seasons': seasons,
+    })
+
     # Calculate win percentage
-    aggregated['Win Pct (%)'] = (aggregated['Total Wins'] / 
-                             (aggregated['Total Wins'] + aggregated['Total Losses']) * 100).round(1)
-    
+    aggregated['Win Pct (%)'] = (total_wins / (total_wins + total_losses) * 100).round(1)
+
     # Calculate average points per season
-    aggregated['Avg PF Per Season'] = (aggregated['Total PF'] / aggregated['Seasons']).round(2)
-    
+    aggregated['Avg PF Per Season'] = (total_pf / seasons).round(2)
+
     # Sort by total wins
     aggregated = aggregated.sort_values('Total Wins', ascending=False)
-    
+
     return aggregated
 
 
 def get_season_by_season_records(league_id):
     """
     Get formatted standings for a single season with calculated fields.
-    
+
+    Finished seasons are immutable, so their tables cache for a year;
+    the in-progress season refreshes every ten minutes. Which bucket a
+    league falls in comes from comparing its season against the NFL
+    state, defaulting to the short-lived cache if that check fails.
+
     Args:
         league_id: Single league ID
-    
+
     Returns: DataFrame with standings for that season
     """
+    try:
+        current_season = get_nfl_state().get('season')
+        is_live = get_league_info(league_id).get('season') == current_season
+    except Exception as e:
+        print(f"Error checking season state for league {league_id}: {e}")
+        is_live = True
+    if is_live:
+        return _season_records_live(league_id)
+    return _season_records_final(league_id)
+
+
+@st.cache_data(ttl=365 * 86400)
+def _season_records_final(league_id):
+    return _build_season_records(league_id)
+
+
+@st.cache_data(ttl=600)
+def _season_records_live(league_id):
+    return _build_season_records(league_id)
+
+
+def _build_season_records(league_id):
     # Get raw season data
     season_df = get_season_standings(league_id)
     
     if season_df.empty:
         return pd.DataFrame()
     
-    # Calculate total points (including decimals)
-    season_df['total_fpts'] = season_df['fpts'] + season_df['fpts_decimal'] / 100
-    season_df['total_ppts'] = season_df['ppts'] + season_df['ppts_decimal'] / 100
-    
-    # Create formatted output DataFrame
+    # Create formatted output DataFrame — fpts/ppts already include the
+    # decimal part from get_season_standings
     result_df = pd.DataFrame({
         'Team Name': season_df['team_name'],
         'Owner': season_df['username'],
         'Wins': season_df['wins'],
         'Losses': season_df['losses'],
-        'PF': season_df['total_fpts'].round(2),
-        'Max PF': season_df['total_ppts'].round(2),
+        'PF': season_df['fpts'].round(2),
+        'Max PF': season_df['ppts'].round(2),
         'Total Moves': season_df['total_moves'],
     })
     
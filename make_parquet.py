@@ -0,0 +1,22 @@
+"""One-time converter for the rankings dataset.
+
+Reads ff_player_basic_dataset.csv and writes a snappy-compressed
+parquet copy that the website loads instead of re-parsing the CSV on
+every cold start. Re-run after regenerating the dataset:
+
+    python make_parquet.py
+"""
+import pandas as pd
+
+CSV_PATH = "ff_player_basic_dataset.csv"
+PARQUET_PATH = "ff_player_basic_dataset.parquet"
+
+
+def main():
+    df = pd.read_csv(CSV_PATH)
+    df.to_parquet(PARQUET_PATH, engine="pyarrow", compression="snappy", index=False)
+    print(f"Wrote {PARQUET_PATH} ({len(df)} rows, {len(df.columns)} columns)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 import streamlit as st
 import pandas as pd
 import numpy as np
 
+from sleeper_api import (
+    fetch_matchups_bulk,
+    get_all_rosters,
+    get_league_users,
+    get_playoff_bracket,
+)
+
 BASE_URL = "https://api.sleeper.app/v1"
 
+# One pooled session for every Sleeper call in this module: connections are
+# reused across the parallel fetches instead of re-handshaking per request
+_session = requests.Session()
+
+def _get_json(url):
+    return _session.get(url, timeout=30).json()
+
+@st.cache_data(ttl=86400)
+def load_player_positions():
+    """
+    player_id -> position map, cached for a day. The /players/nfl payload
+    is several MB and changes at most daily, and slot labeling only ever
+    reads position — so the cached object is the slim dict, not the blob.
+    """
+    players = _get_json(f"{BASE_URL}/players/nfl")
+    return {p_id: p.get('position') for p_id, p in players.items()}
+
 def get_playoff_roster_ids(league_id):
-    bracket = requests.get(f"{BASE_URL}/league/{league_id}/winners_bracket").json()
+    # The shared cached bracket fetcher means the Roster and History tabs
+    # hit the same memoized entry instead of re-downloading per tab
+    bracket = get_playoff_bracket(league_id)
     # Pulls team IDs that participated in the semi-finals/finals
     playoff_teams = {match[t] for match in bracket for t in ['t1', 't2'] if match.get(t)}
     return list(playoff_teams)
 
 def get_user_roster_id(league_id, username):
     """Get the roster_id for a specific username"""
-    users = requests.get(f"{BASE_URL}/league/{league_id}/users").json()
-    rosters = requests.get(f"{BASE_URL}/league/{league_id}/rosters").json()
-    
-    # Find user_id from username
-    user_id = None
-    for user in users:
-        if user['display_name'] == username or user.get('username') == username:
-            user_id = user['user_id']
-            break
-    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        users_future = pool.submit(get_league_users, league_id)
+        rosters_future = pool.submit(get_all_rosters, league_id)
+    users = users_future.result()
+    rosters = rosters_future.result()
+
+    # Find user_id from username (either display_name or username may match)
+    user_id = next(
+        (u['user_id'] for u in users
+         if u['display_name'] == username or u.get('username') == username),
+        None
+    )
+
     if not user_id:
         return None
-    
-    # Find roster_id from user_id
-    for roster in rosters:
-        if roster['owner_id'] == user_id:
-            return roster['roster_id']
-    
-    return None
+
+    # Find roster_id from user_id with a dict index
+    roster_by_owner = {r['owner_id']: r for r in rosters}
+    roster = roster_by_owner.get(user_id)
+    return roster['roster_id'] if roster else None
+
+# Integer position codes for the slot kernel; index order doubles as the
+# slot-label lookup
+_POS_CODE = {'QB': 0, 'RB': 1, 'WR': 2, 'TE': 3}
+_POS_LABELS = ('QB', 'RB', 'WR', 'TE')
+_SLOT_LIMITS = (1, 2, 3, 1)
 
 def label_roster_slots(starter_data):
     """
-    Sorts players into specific slots: QB1, RB1, RB2, WR1, WR2, WR3, TE1, 
+    Sorts players into specific slots: QB1, RB1, RB2, WR1, WR2, WR3, TE1,
     Flex1, Flex2, Superflex1 based on weekly production.
+
+    Structure-of-arrays fast path: positions become int8 codes and points
+    a float32 vector, then one argsort plus a single typed walk fills the
+    slots — no dict-of-strings shuffling per starter.
     """
-    # Sort all starters by points descending
-    starters = sorted(starter_data, key=lambda x: x['pts'], reverse=True)
-    
+    n = len(starter_data)
+    pos = np.fromiter((_POS_CODE.get(s['pos'], -1) for s in starter_data),
+                      dtype=np.int8, count=n)
+    pts = np.fromiter((s['pts'] for s in starter_data),
+                      dtype=np.float32, count=n)
+
     slots = {}
-    counts = {'QB': 0, 'RB': 0, 'WR': 0, 'TE': 0, 'FLEX': 0, 'SF': 0}
-    
-    # 1. Fill Primary Slots first
-    remaining = []
-    for s in starters:
-        pos = s['pos']
-        if pos == 'QB' and counts['QB'] < 1:
-            slots['QB1'] = s['pts']; counts['QB'] += 1
-        elif pos == 'RB' and counts['RB'] < 2:
-            counts['RB'] += 1; slots[f'RB{counts["RB"]}'] = s['pts']
-        elif pos == 'WR' and counts['WR'] < 3:
-            counts['WR'] += 1; slots[f'WR{counts["WR"]}'] = s['pts']
-        elif pos == 'TE' and counts['TE'] < 1:
-            slots['TE1'] = s['pts']; counts['TE'] += 1
-        else:
-            remaining.append(s)
+    counts = [0, 0, 0, 0]
+    flex = 0
+    leftovers = []
 
-    # 2. Fill Flex (RB/WR/TE)
-    final_remain = []
-    for s in remaining:
-        if s['pos'] in ['RB', 'WR', 'TE'] and counts['FLEX'] < 2:
-            counts['FLEX'] += 1; slots[f'Flex{counts["FLEX"]}'] = s['pts']
+    # One descending walk: primary slots first, RB/WR/TE spill into flex,
+    # everything else queues for the superflex
+    for i in np.argsort(-pts, kind='stable'):
+        p = pos[i]
+        value = float(pts[i])
+        if p >= 0 and counts[p] < _SLOT_LIMITS[p]:
+            counts[p] += 1
+            slots[f'{_POS_LABELS[p]}{counts[p]}'] = value
+        elif p >= 1 and flex < 2:
+            flex += 1
+            slots[f'Flex{flex}'] = value
         else:
-            final_remain.append(s)
-            
-    # 3. Fill Superflex (Any)
-    if final_remain:
-        slots['Superflex1'] = final_remain[0]['pts']
-        
+            leftovers.append(value)
+
+    # Fill Superflex (Any)
+    if leftovers:
+        slots['Superflex1'] = leftovers[0]
+
     return slots
 
 def fetch_season_positional_avg(league_id, roster_ids=None):
@@ -83,15 +118,19 @@ def fetch_season_positional_avg(league_id, roster_ids=None):
     elif not isinstance(roster_ids, list):
         roster_ids = [roster_ids]
     
-    players = requests.get(f"{BASE_URL}/players/nfl").json()
-    
+    positions = load_player_positions()
+
+    # All 14 weekly matchup calls coalesce into one bulk fan-out; the
+    # shared matchup cache also dedupes the overlapping scans when the
+    # user and playoff averages cover the same league
+    week_matchups = fetch_matchups_bulk([(league_id, week) for week in range(1, 15)])
+
     weekly_results = []
-    for week in range(1, 15):
-        matchups = requests.get(f"{BASE_URL}/league/{league_id}/matchups/{week}").json()
+    for matchups in week_matchups.values():
         for team in matchups:
             if team['roster_id'] in roster_ids:
                 starter_data = [
-                    {'pos': players.get(p_id, {}).get('position'), 'pts': team['starters_points'][i]}
+                    {'pos': positions.get(p_id), 'pts': team['starters_points'][i]}
                     for i, p_id in enumerate(team['starters']) if p_id != "0"
                 ]
                 weekly_results.append(label_roster_slots(starter_data))
@@ -112,10 +151,15 @@ def get_comprehensive_roster_analysis(league_id_2024, league_id_2025, league_id_
         st.error(f"Could not find roster for username: {username}")
         return None
     
-    # Calculate all averages
-    bgm_2025_avg = fetch_season_positional_avg(league_id_2025, user_roster_id)
-    playoff_2024_avg = fetch_season_positional_avg(league_id_2024)
-    playoff_2025_avg = fetch_season_positional_avg(league_id_2025)
+    # Calculate all averages — the three season scans are independent, so
+    # they run concurrently on top of the per-season parallel fetches
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        bgm_future = pool.submit(fetch_season_positional_avg, league_id_2025, user_roster_id)
+        playoff_2024_future = pool.submit(fetch_season_positional_avg, league_id_2024)
+        playoff_2025_future = pool.submit(fetch_season_positional_avg, league_id_2025)
+    bgm_2025_avg = bgm_future.result()
+    playoff_2024_avg = playoff_2024_future.result()
+    playoff_2025_avg = playoff_2025_future.result()
     
     # Define position order
     position_order = ['QB1', 'RB1', 'RB2', 'WR1', 'WR2', 'WR3', 'TE1', 'Flex1', 'Flex2', 'Superflex1']
@@ -139,9 +183,12 @@ def render_roster_tab(league_id_2024, league_id_2025):
 
     if st.button("Run Analytics"):
         with st.spinner("Crunching Sleeper Data..."):
-            # Fetch data for both seasons
-            data_2024 = fetch_season_positional_avg(league_id_2024)
-            data_2025 = fetch_season_positional_avg(league_id_2025)
+            # Fetch data for both seasons concurrently
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                future_2024 = pool.submit(fetch_season_positional_avg, league_id_2024)
+                future_2025 = pool.submit(fetch_season_positional_avg, league_id_2025)
+            data_2024 = future_2024.result()
+            data_2025 = future_2025.result()
 
             # Combine into a clean DataFrame
             all_pos = sorted(list(set(data_2024.keys()) | set(data_2025.keys())))
@@ -1,126 +1,239 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 
-@st.cache_data(ttl=86400)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared session: keep-alive connections get reused across every Sleeper
+# call instead of paying a fresh TCP/TLS handshake per request, and
+# transient 429/5xx responses retry with backoff (honoring Retry-After)
+# instead of crashing the tab body
+_RETRY = Retry(total=3, backoff_factor=0.3,
+               status_forcelist=[429, 500, 502, 503, 504],
+               respect_retry_after_header=True)
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(max_retries=_RETRY,
+                                       pool_connections=8, pool_maxsize=16))
+
+# Separate connect/read limits: fail fast on unreachable hosts while
+# allowing the larger payloads time to stream
+_TIMEOUT = (3.05, 10)
+
+def _get_json(url):
+    # orjson parses the multi-MB players payload several times faster
+    # than stdlib json; fall back transparently when it isn't installed
+    r = _SESSION.get(url, timeout=_TIMEOUT)
+    r.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(r.content)
+    return r.json()
+
+_PLAYERS_URL = "https://api.sleeper.app/v1/players/nfl"
+_PLAYERS_REFRESH_SECONDS = 300
+
+@st.cache_data(ttl=86400, persist="disk", show_spinner=False)
+def _download_players(cache_date=None):
+    """Full players download, persisted to disk so a server restart loads
+    the pickle instead of refetching. The daily cache_date key busts the
+    persisted entry — ttl and persist don't expire together reliably.
+    Returns the payload with its ETag for conditional revalidation.
+    """
+    r = _SESSION.get(_PLAYERS_URL, timeout=_TIMEOUT)
+    r.raise_for_status()
+    payload = orjson.loads(r.content) if orjson is not None else r.json()
+    return payload, r.headers.get('ETag')
+
 def get_players():
-    """Pull in all players from Sleeper API"""
-    return requests.get("https://api.sleeper.app/v1/players/nfl").json()
+    """Pull in all players from Sleeper API.
+
+    Freshness comes from an inline conditional GET instead of a fixed
+    day-long TTL: repeat calls within five minutes serve the
+    session-cached payload, after which an If-None-Match request
+    revalidates — a 304 just bumps the clock while a 200 swaps in the
+    fresh payload. Cold sessions seed from the disk-persisted download.
+    """
+    now = time.time()
+    cache = st.session_state.get('players_cache')
+    if cache is None:
+        payload, etag = _download_players(date.today().isoformat())
+        cache = {'payload': payload, 'etag': etag, 'fetched_at': now}
+        st.session_state['players_cache'] = cache
+    elif now - cache['fetched_at'] >= _PLAYERS_REFRESH_SECONDS:
+        headers = {'If-None-Match': cache['etag']} if cache['etag'] else {}
+        r = _SESSION.get(_PLAYERS_URL, timeout=_TIMEOUT, headers=headers)
+        if r.status_code == 304:
+            cache['fetched_at'] = now
+        elif r.ok:
+            cache['payload'] = orjson.loads(r.content) if orjson is not None else r.json()
+            cache['etag'] = r.headers.get('ETag')
+            cache['fetched_at'] = now
+    return cache['payload']
+
+# The exact player fields the roster table consumes
+_PLAYER_FIELDS = (
+    # Identity
+    'player_id', 'first_name', 'last_name',
+    # Position & Team
+    'position', 'team', 'fantasy_positions', 'depth_chart_position', 'depth_chart_order',
+    # Status
+    'status', 'active', 'injury_status', 'injury_body_part', 'injury_notes',
+    'injury_start_date', 'practice_participation',
+    # Physical
+    'number', 'age', 'height', 'weight',
+    # Background
+    'college', 'high_school', 'years_exp', 'birth_date', 'birth_city',
+    'birth_state', 'birth_country',
+    # Search Fields
+    'search_first_name', 'search_last_name', 'search_full_name', 'search_rank',
+    # IDs
+    'espn_id', 'fantasy_data_id', 'gsis_id',
+)
+
+@st.cache_data(ttl=86400)
+def get_players_slim():
+    """Projection of get_players down to the fields the roster table uses.
 
+    The full players blob is several MB and st.cache_data re-pickles its
+    value on every hit, so the cached object here is the ~30-field
+    projection rather than the whole payload.
+    """
+    return {
+        pid: {k: p.get(k) for k in _PLAYER_FIELDS}
+        for pid, p in get_players().items()
+    }
+
+@st.cache_data(ttl=30 * 24 * 3600)  # user_id never changes
 def get_user_info(username):
     """Get user information by username"""
-    return requests.get(f"https://api.sleeper.app/v1/user/{username}").json()
+    return _get_json(f"https://api.sleeper.app/v1/user/{username}")
 
+@st.cache_data(ttl=3600)
 def get_league_info(league_id):
     """Get league information"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}")
 
+@st.cache_data(ttl=600)
 def get_all_rosters(league_id):
     """Get all rosters in the league"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/rosters").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/rosters")
+
+@st.cache_data(ttl=600)
+def _rosters_by_owner(league_id):
+    """League rosters indexed by owner_id for O(1) lookups."""
+    return {r['owner_id']: r for r in get_all_rosters(league_id)}
 
 def get_my_roster(league_id, username):
-    """Get my full roster object from Sleeper"""
-    rosters = get_all_rosters(league_id)
-    user = get_user_info(username)
-    user_id = user["user_id"]
-    my_roster = next(r for r in rosters if r["owner_id"] == user_id)
-    return my_roster
+    """Get my full roster object from Sleeper.
+
+    Returns None instead of raising when the user has no roster in the
+    league.
+    """
+    # The roster index and user lookup are independent round trips
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        rosters_future = pool.submit(_rosters_by_owner, league_id)
+        user_future = pool.submit(get_user_info, username)
+    return rosters_future.result().get(user_future.result()["user_id"])
+
+# Columns the Roster tab renders — fixed here so the display slice is
+# built once alongside the frame instead of re-projected every rerun
+DISPLAY_COLS = ('full_name', 'position', 'team', 'age', 'injury_status', 'years_exp')
 
 def get_my_roster_dataframe(league_id, username):
     """
     Get my roster as a comprehensive DataFrame with all available player info.
-    Returns: pandas DataFrame with all Sleeper API player fields
+    Returns: (full DataFrame with all Sleeper API player fields,
+              display DataFrame projected to DISPLAY_COLS)
     """
-    # Get roster and all players
+    # Get roster and the slim player projection
     my_roster = get_my_roster(league_id, username)
-    all_players = get_players()
-    player_ids = my_roster.get('players', [])
-    
-    roster_data = []
-    
-    for player_id in player_ids:
-        if player_id in all_players:
-            player = all_players[player_id]
-            
-            # Extract ALL available fields from Sleeper API
-            player_data = {
-                # Identity
-                'player_id': player.get('player_id', player_id),
-                'first_name': player.get('first_name', ''),
-                'last_name': player.get('last_name', ''),
-                'full_name': f"{player.get('first_name', '')} {player.get('last_name', '')}".strip() or player_id,
-                
-                # Position & Team
-                'position': player.get('position'),
-                'team': player.get('team'),
-                'fantasy_positions': player.get('fantasy_positions'),
-                'depth_chart_position': player.get('depth_chart_position'),
-                'depth_chart_order': player.get('depth_chart_order'),
-                
-                # Status
-                'status': player.get('status'),
-                'active': player.get('active'),
-                'injury_status': player.get('injury_status'),
-                'injury_body_part': player.get('injury_body_part'),
-                'injury_notes': player.get('injury_notes'),
-                'injury_start_date': player.get('injury_start_date'),
-                'practice_participation': player.get('practice_participation'),
-                
-                # Physical
-                'number': player.get('number'),
-                'age': player.get('age'),
-                'height': player.get('height'),
-                'weight': player.get('weight'),
-                
-                # Background
-                'college': player.get('college'),
-                'high_school': player.get('high_school'),
-                'years_exp': player.get('years_exp'),
-                'birth_date': player.get('birth_date'),
-                'birth_city': player.get('birth_city'),
-                'birth_state': player.get('birth_state'),
-                'birth_country': player.get('birth_country'),
-                
-                # Search Fields
-                'search_first_name': player.get('search_first_name'),
-                'search_last_name': player.get('search_last_name'),
-                'search_full_name': player.get('search_full_name'),
-                'search_rank': player.get('search_rank'),
-                
-                # IDs
-                'espn_id': player.get('espn_id'),
-                'fantasy_data_id': player.get('fantasy_data_id'),
-                'gsis_id': player.get('gsis_id'),
-            }
-            
-            roster_data.append(player_data)
-    
-    # Create DataFrame
-    df = pd.DataFrame(roster_data).sort_values('search_rank')
-    
-    return df
+    all_players = get_players_slim()
+    player_ids = (my_roster or {}).get('players', [])
+
+    # One from_records pass over the slim dicts; the per-player Python
+    # dict construction becomes a single C-level column build with the
+    # derived columns assigned vectorized afterwards
+    ids = [pid for pid in player_ids if pid in all_players]
+    df = pd.DataFrame.from_records([all_players[pid] for pid in ids],
+                                   columns=list(_PLAYER_FIELDS))
 
+    # Fall back to the roster id when the payload carries no player_id
+    df['player_id'] = df['player_id'].fillna(pd.Series(ids, dtype=object))
+
+    first = df['first_name'].fillna('')
+    last = df['last_name'].fillna('')
+    df['first_name'] = first
+    df['last_name'] = last
+    full_name = (first + ' ' + last).str.strip()
+    df.insert(3, 'full_name', full_name.mask(full_name == '', df['player_id']))
+
+    # Low-cardinality strings become categoricals (int codes instead of
+    # object pointers) and the numeric fields nullable narrow ints;
+    # Sleeper sends some numbers as strings, hence to_numeric first
+    df = df.astype({
+        'position': 'category', 'team': 'category', 'status': 'category',
+        'injury_status': 'category', 'practice_participation': 'category',
+        'depth_chart_position': 'category', 'college': 'category',
+        'birth_state': 'category', 'birth_country': 'category',
+    })
+    for col, dtype in (('age', 'Int16'), ('years_exp', 'Int16'), ('number', 'Int16'),
+                       ('weight', 'Int32'), ('search_rank', 'Int32')):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+
+    # Stable sort handles the partially-ordered input without extra
+    # swapping, unranked players sink explicitly, and ignore_index skips
+    # the post-sort index copy
+    df = df.sort_values('search_rank', kind='stable', na_position='last',
+                        ignore_index=True)
+    return df, df[[c for c in DISPLAY_COLS if c in df.columns]]
+
+@st.cache_data(ttl=3600)
 def get_league_users(league_id):
     """Get all users in the league"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/users").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/users")
 
+@st.cache_data(ttl=300)
 def get_matchups(league_id, week):
     """Get matchups for a specific week"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/matchups/{week}").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/matchups/{week}")
+
+def fetch_matchups_bulk(pairs, max_workers=8):
+    """Fetch matchups for many (league_id, week) pairs in one fan-out.
+
+    DataLoader-style coalescing: callers collect every pair they need up
+    front and get back a dict keyed by (league_id, week), so a season's
+    worth of round trips collapses into a few parallel waves over the
+    shared session. Repeated pairs dedupe through the get_matchups cache.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pair: pool.submit(get_matchups, *pair) for pair in pairs}
+    return {pair: future.result() for pair, future in futures.items()}
 
+@st.cache_data(ttl=300)
 def get_transactions(league_id, week):
     """Get transactions for a specific week"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/transactions/{week}").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/transactions/{week}")
 
+@st.cache_data(ttl=3600)
 def get_traded_picks(league_id):
     """Get all traded draft picks"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/traded_picks").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/traded_picks")
 
+@st.cache_data(ttl=600)
 def get_playoff_bracket(league_id):
     """Get playoff bracket if playoffs have started"""
-    return requests.get(f"https://api.sleeper.app/v1/league/{league_id}/winners_bracket").json()
+    return _get_json(f"https://api.sleeper.app/v1/league/{league_id}/winners_bracket")
 
+@st.cache_data(ttl=600)
 def get_nfl_state():
     """Get current state of NFL season"""
-    return requests.get("https://api.sleeper.app/v1/state/nfl").json()
\ No newline at end of file
+    return _get_json("https://api.sleeper.app/v1/state/nfl")
\ No newline at end of file
@@ -1,4 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import nflreadpy as nfl
+import numpy as np
 import pandas as pd
 import streamlit as st
 import requests
@@ -24,64 +27,72 @@ st.set_page_config(
     layout="wide"
 )
 
-# Create tabs
-tabs = st.tabs(["Home", "Roster", "Trade Analyzer", "Internal Player Rankings", "History"])
+# Each tab body is an st.fragment so widget interactions inside one tab
+# rerun only that fragment — clicking around Home no longer replays the
+# Roster and History network fan-out
 
 # ===== HOME TAB =====
-with tabs[0]:
+@st.fragment
+def show_home_tab():
     st.title("Big Green Machine HQ")
     st.write("NBTTM")
 
+@st.cache_data
+def _roster_to_csv(df):
+    """CSV bytes for the download button, re-serialized only when the
+    roster frame actually changes rather than on every rerun."""
+    return df.to_csv(index=False).encode()
+
 # ===== ROSTER TAB =====
-with tabs[1]:
+@st.fragment
+def show_roster_tab():
     st.title("BGM Roster & Playoff Analytics")
 
     # EXPANDER 1: CURRENT ROSTER
     with st.expander("📋 Current Roster", expanded=True):
-        df = get_my_roster_dataframe(LEAGUE_ID_2026, USERNAME)
-        # Defined static columns for a cleaner look
-        display_cols = ['full_name', 'position', 'team', 'age', 'injury_status', 'years_exp']
-        existing_cols = [c for c in display_cols if c in df.columns]
-        
-        st.dataframe(df[existing_cols], use_container_width=True, hide_index=True)
-        
-        csv = df.to_csv(index=False)
+        # The static display projection comes pre-sliced with the frame
+        df, display_df = get_my_roster_dataframe(LEAGUE_ID_2026, USERNAME)
+
+        st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+        csv = _roster_to_csv(df)
         st.download_button("Download CSV", data=csv, file_name="roster.csv", mime="text/csv")
 
     # EXPANDER 2: PLAYOFF PRODUCTION ANALYTICS
     with st.expander("📈 Performance vs Playoff Benchmarks", expanded=False):
-        
+
         with st.spinner("Analyzing performance across all seasons..."):
             analysis_df = get_comprehensive_roster_analysis(
-                LEAGUE_ID_2024, 
-                LEAGUE_ID_2025, 
-                LEAGUE_ID_2026, 
+                LEAGUE_ID_2024,
+                LEAGUE_ID_2025,
+                LEAGUE_ID_2026,
                 USERNAME
             )
-            
+
             if analysis_df is not None:
-                    # Style the dataframe for better readability
-                    def color_delta(val):
-                        """Color negative deltas red, positive green"""
-                        color = 'red' if val < 0 else 'green' if val > 0 else 'black'
-                        return f'color: {color}'
-                    
+                    # Style the dataframe for better readability: one
+                    # vectorized comparison colors negative deltas red and
+                    # positive green (applymap is deprecated in pandas 2.1)
                     styled_df = analysis_df.style.format({
                         "2025 BGM Avg": "{:.2f}",
                         "2024 Playoff Avg": "{:.2f}",
                         "2025 Playoff Avg": "{:.2f}",
                         "Delta vs 2025 Playoff": "{:+.2f}"
-                    }).applymap(color_delta, subset=['Delta vs 2025 Playoff'])
-                    
+                    }).apply(
+                        lambda s: np.where(s < 0, 'color: red',
+                                  np.where(s > 0, 'color: green', 'color: black')),
+                        subset=['Delta vs 2025 Playoff']
+                    )
+
                     st.dataframe(styled_df, use_container_width=True, hide_index=True)
-                    
+
                     # Summary Metrics
                     col1, col2, col3, col4 = st.columns(4)
-                    
+
                     with col1:
                         bgm_total = analysis_df["2025 BGM Avg"].sum()
                         st.metric("Your 2025 Avg Weekly Score", f"{bgm_total:.1f} pts")
-                    
+
                     with col2:
                         playoff_2024_total = analysis_df["2024 Playoff Avg"].sum()
                         st.metric("2024 Playoff Avg", f"{playoff_2024_total:.1f} pts")
@@ -89,52 +100,72 @@ with tabs[1]:
                     with col3:
                         playoff_2025_total = analysis_df["2025 Playoff Avg"].sum()
                         st.metric("2025 Playoff Avg", f"{playoff_2025_total:.1f} pts")
-                    
+
                     with col4:
                         delta_total = analysis_df["Delta vs 2025 Playoff"].sum()
-                        st.metric("Total Gap (2025)", f"{delta_total:+.1f} pts", 
+                        st.metric("Total Gap (2025)", f"{delta_total:+.1f} pts",
                                  delta_color="inverse")
 
 # ===== TRADE ANALYZER TAB =====
-with tabs[2]:
+@st.fragment
+def show_trade_analyzer_tab():
     st.title("Trade Analyzer")
     st.info("Trade analysis features coming soon!")
 
 # ===== INTERNAL PLAYER RANKINGS TAB =====
-with tabs[3]:
-    def load_all_data():
-        # Construct dataset from nflreadpy
+@st.cache_data(ttl=24 * 3600, persist="disk", show_spinner="Loading rankings…")
+def load_all_data():
+    """Static dataset plus composite metrics, built once a day and
+    persisted so server restarts skip the rebuild."""
+    # Construct dataset from nflreadpy — the parquet copy (written by
+    # make_parquet.py) loads typed columns without a text parse; fall
+    # back to the CSV until the conversion has been run
+    try:
+        adv_data = pd.read_parquet('ff_player_basic_dataset.parquet', engine='pyarrow')
+    except FileNotFoundError:
         adv_data = pd.read_csv('ff_player_basic_dataset.csv')
-        # Add composit metrics
-        full_data = add_trajectory_metrics(adv_data)
-        adv_data = calculate_composite_metrics(full_data)
-        # Return full set
-        return adv_data
-
+    # Add composit metrics
+    full_data = add_trajectory_metrics(adv_data)
+    adv_data = calculate_composite_metrics(full_data)
+    # Return full set
+    return adv_data
+
+@st.fragment
+def show_rankings_tab():
     # Load data
     all_data = load_all_data()
 
     render_internal_rankings_tab(all_data)
 
 # ===== HISTORY TAB =====
-league_ids = [LEAGUE_ID_2024, LEAGUE_ID_2025, LEAGUE_ID_2026]
-bgm_history = get_franchise_history(league_ids, USERNAME)
-
-with tabs[4]:
+@st.fragment
+def show_history_tab():
     st.title("History")
-    
-    # Get team/league stats for history
-    league_info = get_league_info(LEAGUE_ID_2026)
-    all_rosters = get_all_rosters(LEAGUE_ID_2026)
-    league_users = get_league_users(LEAGUE_ID_2026)
-    
+
+    # Franchise history only renders here, so its multi-league fan-out
+    # belongs inside the tab body rather than on every script run
+    league_ids = [LEAGUE_ID_2024, LEAGUE_ID_2025, LEAGUE_ID_2026]
+    bgm_history = get_franchise_history(league_ids, USERNAME)
+
+    # The tab's Sleeper lookups and the three season tables are all
+    # independent round trips, so they fan out on one pool
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        league_info_future = pool.submit(get_league_info, LEAGUE_ID_2026)
+        all_rosters_future = pool.submit(get_all_rosters, LEAGUE_ID_2026)
+        league_users_future = pool.submit(get_league_users, LEAGUE_ID_2026)
+        records_futures = {lid: pool.submit(get_season_by_season_records, lid)
+                           for lid in league_ids}
+    league_info = league_info_future.result()
+    all_rosters = all_rosters_future.result()
+    league_users = league_users_future.result()
+
     st.subheader("BGM Franchise History")
-    
+
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("All-Time Record", f"{bgm_history['total_wins']}-{bgm_history['total_losses']}-{bgm_history['total_ties']}")
-    with col2: 
+    with col2:
         st.metric("Seasons", bgm_history['seasons_played'])
     with col3:
         st.metric("Playoff Appearances", bgm_history['playoff_appearances'])
@@ -142,22 +173,35 @@ with tabs[4]:
         st.metric("Championships", bgm_history['championships'])
 
     st.subheader(f"{league_info.get('name', 'League')} League History")
-    
+
     # Get league-wide standings
     all_time_df = get_all_time_standings(league_ids)
     with st.expander("Total League History"):
         st.dataframe(all_time_df)
-        
+
     # Individual seasons
-    league_2024_df = get_season_by_season_records(LEAGUE_ID_2024)
+    league_2024_df = records_futures[LEAGUE_ID_2024].result()
     with st.expander("2024 League Results"):
         st.dataframe(league_2024_df, hide_index=True)
 
-    league_2025_df = get_season_by_season_records(LEAGUE_ID_2025)
+    league_2025_df = records_futures[LEAGUE_ID_2025].result()
     with st.expander("2025 League Results"):
         st.dataframe(league_2025_df, hide_index=True)
 
-    league_2026_df = get_season_by_season_records(LEAGUE_ID_2026)
+    league_2026_df = records_futures[LEAGUE_ID_2026].result()
     with st.expander("2026 League Results"):
         st.dataframe(league_2026_df, hide_index=True)
-    
+
+# Create tabs
+tabs = st.tabs(["Home", "Roster", "Trade Analyzer", "Internal Player Rankings", "History"])
+
+with tabs[0]:
+    show_home_tab()
+with tabs[1]:
+    show_roster_tab()
+with tabs[2]:
+    show_trade_analyzer_tab()
+with tabs[3]:
+    show_rankings_tab()
+with tabs[4]:
+    show_history_tab()